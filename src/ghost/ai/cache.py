@@ -0,0 +1,122 @@
+"""Response caching for AI completions."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "ghost" / "responses.sqlite"
+
+
+def _dumps(payload: Dict[str, Any]) -> bytes:
+    """Serialize a request payload canonically, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(payload, sort_keys=True).encode()
+
+
+class ResponseCache:
+    """Cache of AI responses keyed by an exact hash of the full request.
+    
+    Entries are persisted to SQLite so they survive across invocations, and the
+    least recently used ones are dropped once there are more than MAX_ENTRIES.
+    """
+    
+    MAX_ENTRIES = 1000
+    
+    def __init__(self, path: Optional[Path] = DEFAULT_CACHE_PATH):
+        """Initialize the cache, falling back to memory-only if the database can't be opened."""
+        self._exact_cache: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._db = self._open(path) if path else None
+    
+    @staticmethod
+    def _open(path: Path) -> Optional[sqlite3.Connection]:
+        """Open (and create if needed) the on-disk cache database."""
+        try:
+            # Responses can quote command output and file contents, so keep them private to the user
+            path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            os.chmod(path.parent, 0o700)
+            os.close(os.open(path, os.O_RDWR | os.O_CREAT, 0o600))
+            os.chmod(path, 0o600)
+            db = sqlite3.connect(str(path), check_same_thread=False)
+            # Databases written by older versions had a different layout; it is only a cache, so start over
+            columns = {row[1] for row in db.execute("PRAGMA table_info(responses)")}
+            if columns and columns != {"key", "response", "last_used"}:
+                db.execute("DROP TABLE responses")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, last_used REAL NOT NULL DEFAULT 0)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            db.commit()
+            return db
+        except (OSError, sqlite3.Error):
+            return None
+    
+    @staticmethod
+    def make_key(
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        json_mode: bool = False,
+        stream: bool = False
+    ) -> str:
+        """Build the exact-match key for a completion request."""
+        # Streamed replies are stored raw and others cleaned, so the two never share an entry
+        payload = _dumps({
+            "m": model, "t": temperature, "x": max_tokens, "j": json_mode, "s": stream, "msgs": messages
+        })
+        return hashlib.blake2b(payload).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for an exact key, if any."""
+        with self._lock:
+            if key in self._exact_cache:
+                return self._exact_cache[key]
+            if self._db is None:
+                return None
+            try:
+                row = self._db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error:
+                return None
+            if row is None:
+                return None
+            try:
+                self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+            self._exact_cache[key] = row[0]
+            return row[0]
+    
+    def put(self, key: str, response: str):
+        """Store a response under its exact key, evicting the least recently used beyond MAX_ENTRIES."""
+        with self._lock:
+            self._exact_cache[key] = response
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, last_used) VALUES (?, ?, ?)",
+                    (key, response, time.time())
+                )
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.MAX_ENTRIES,)
+                )
+                self._db.commit()
+            except sqlite3.Error:
+                pass 
\ No newline at end of file
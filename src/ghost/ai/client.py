@@ -1,53 +1,167 @@
 """OpenAI client wrapper."""
 
+import functools
+import importlib.util
 import os
-from typing import List, Dict, Optional
-from openai import OpenAI
+import re
+from typing import TYPE_CHECKING, Iterator, List, Dict, Optional, Union
+
+from .cache import ResponseCache
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import OpenAI
+
+# Template artifacts removed from responses in a single pass
+_CLEAN_RE = re.compile(r"\{\{response_code\}\}|\{\{|\}\}|<placeholder>|```")
+_STRIP_TBL = str.maketrans("", "", "`\"'")
+_LANGUAGE_TAGS = frozenset({'python', 'javascript', 'bash', 'html', 'css', 'json', 'yaml', 'sh'})
+# Longest first line still worth normalizing to look for a language tag
+_LANGUAGE_TAG_LINE_MAX = 16
 
 
 class AIClient:
     """Wrapper for OpenAI client with ghost-specific functionality."""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, use_cache: bool = True):
         """Initialize the AI client."""
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key is required")
         
-        self.client = OpenAI(api_key=self.api_key)
+        self.cache = ResponseCache() if use_cache else None
+    
+    @functools.cached_property
+    def client(self) -> "OpenAI":
+        """OpenAI client, built on first request and reused for the rest of the run."""
+        # The SDK is slow to import, and runs answered from the cache never need it
+        from openai import OpenAI
+        return OpenAI(api_key=self.api_key, http_client=self._build_http_client())
+    
+    @staticmethod
+    def _build_http_client() -> "httpx.Client":
+        """Build the pooled HTTP client every request of a run goes through."""
+        import httpx
+        
+        # HTTP/2 needs the optional h2 package; without it httpx keeps HTTP/1.1 connections alive
+        http2 = importlib.util.find_spec("h2") is not None
+        return httpx.Client(
+            http2=http2,
+            limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60),
+            timeout=httpx.Timeout(30.0, connect=5.0)
+        )
+    
+    def close(self):
+        """Close the pooled connections, if a request was ever made."""
+        client = self.__dict__.pop("client", None)
+        if client is not None:
+            client.close()
+    
+    def __enter__(self) -> "AIClient":
+        """Use the client as a context manager that closes its connections on exit."""
+        return self
+    
+    def __exit__(self, *exc_info):
+        """Close the client when leaving the context."""
+        self.close()
 
     def generate_completion(
         self,
         messages: List[Dict[str, str]],
         model: str = "gpt-4o-mini",
         temperature: float = 0.3,
-        max_tokens: int = 150
+        max_tokens: int = 150,
+        stream: bool = False,
+        json_mode: bool = False
+    ) -> Union[str, Iterator[str]]:
+        """
+        Generate a completion from the AI model, reusing cached responses when possible.
+        
+        With stream=True an iterator of raw text chunks is returned instead, so the
+        caller can render the response as it arrives and clean it once at the end.
+        With json_mode=True the model must reply with a JSON object, which is
+        returned as-is since cleaning would strip its quotes.
+        """
+        if stream:
+            return self._stream_completion(messages, model, temperature, max_tokens)
+        
+        if self.cache is None:
+            return self._request_completion(messages, model, temperature, max_tokens, json_mode)
+        
+        key = ResponseCache.make_key(messages, model, temperature, max_tokens, json_mode)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        content = self._request_completion(messages, model, temperature, max_tokens, json_mode)
+        self.cache.put(key, content)
+        return content
+    
+    def _request_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        json_mode: bool = False
     ) -> str:
-        """Generate a completion from the AI model."""
+        """Request a completion from the API."""
+        options = {"response_format": {"type": "json_object"}} if json_mode else {}
         response = self.client.chat.completions.create(
             model=model,
             messages=messages,
             temperature=temperature,
-            max_tokens=max_tokens
+            max_tokens=max_tokens,
+            **options
         )
         
         content = response.choices[0].message.content.strip()
-        return self._clean_response(content)
+        return content if json_mode else self.clean_response(content)
+    
+    def _stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Iterator[str]:
+        """Stream a completion from the API chunk by chunk."""
+        if self.cache is not None:
+            key = ResponseCache.make_key(messages, model, temperature, max_tokens, stream=True)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        stream = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        
+        parts = []
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+        
+        if self.cache is not None:
+            # Stored raw, like the chunks a miss yields, since callers clean the joined text
+            self.cache.put(key, ''.join(parts))
     
-    def _clean_response(self, content: str) -> str:
+    def clean_response(self, content: str) -> str:
         """Clean up AI response content."""
-        # Remove common unwanted formatting
-        content = content.replace('{{response_code}}', '')
-        content = content.replace('{{', '')
-        content = content.replace('}}', '')
-        content = content.replace('<placeholder>', '')
-        content = content.replace('```', '')  # Remove markdown code blocks
-        content = content.replace('`', '').replace('"', '').replace("'", "").strip()
-        
-        # Remove common markdown language indicators at the start
-        lines = content.split('\n')
-        if lines and lines[0].strip().lower() in ['python', 'javascript', 'bash', 'html', 'css', 'json', 'yaml', 'sh']:
-            lines = lines[1:]
-            content = '\n'.join(lines)
-        
-        return content.strip() 
\ No newline at end of file
+        # Remove common unwanted formatting, markdown code blocks and quotes
+        content = _CLEAN_RE.sub('', content).translate(_STRIP_TBL).strip()
+        
+        # Remove common markdown language indicators at the start, without
+        # copying the rest of the response or normalizing a long first line
+        newline = content.find('\n')
+        first_line = content if newline == -1 else content[:newline]
+        if len(first_line) <= _LANGUAGE_TAG_LINE_MAX and first_line.strip().lower() in _LANGUAGE_TAGS:
+            content = content[newline + 1:] if newline != -1 else ''
+        
+        return content.strip() 
@@ -1,27 +1,12 @@
 """AI prompt templates."""
 
+import functools
 from typing import Dict
 from ..system import SystemInfo
 
 
-class PromptTemplates:
-    """Collection of prompt templates for AI interactions."""
-    
-    @staticmethod
-    def command_generation(system_info: SystemInfo) -> str:
-        """Generate system prompt for command generation."""
-        return f"""You are an expert system administrator who converts natural language requests into appropriate shell commands.
-
-SYSTEM INFORMATION:
-- Operating System: {system_info.os} {system_info.release}
-- Architecture: {system_info.machine}
-- Shell: {system_info.shell}
-- Current Directory: {system_info.cwd}
-
-IMPORTANT RULES:
-- ONLY return the command, nothing else
-- NO explanations, NO markdown formatting, NO quotes
-- Use commands appropriate for {system_info.os}
+# Identical for every system and directory, so they lead the prompts as a shared cacheable prefix
+_COMMAND_GUIDELINES = """- Use commands appropriate for the operating system given below
 - For macOS: Use /usr/bin, /usr/local/bin paths; avoid /proc (use ps, top, system_profiler instead)
 - For Linux: Use standard Linux utilities and /proc filesystem
 - Prefer built-in commands over external tools when possible
@@ -29,11 +14,62 @@ IMPORTANT RULES:
 - Break complex requests into simple steps
 - If a command might be destructive, start with safer alternatives
 - Never use rm -rf with wildcards or system directories
-- Test commands are preferred (use -n flag for dry runs when available)
+- Test commands are preferred (use -n flag for dry runs when available)"""
+
+_COMMAND_GENERATION_RULES = f"""You are an expert system administrator who converts natural language requests into appropriate shell commands.
+
+IMPORTANT RULES:
+- ONLY return the command, nothing else
+- NO explanations, NO markdown formatting, NO quotes
+{_COMMAND_GUIDELINES}
 
 If previous commands have been executed, use their results to inform your next command.
 Focus on taking the next logical step to answer the original request."""
 
+_NEXT_STEP_RULES = f"""You are an expert system administrator working through a user's request one shell command at a time.
+
+Decide whether the commands executed so far have gathered enough information to answer the request.
+Be practical - don't continue if you have sufficient information to provide a helpful answer.
+
+Respond with a JSON object only, in exactly this form:
+{{"done": false, "reason": "one short sentence", "command": "the next shell command"}}
+- Set "done" to true and "command" to "" once the request can be answered
+- Otherwise "command" is the single next command, with NO explanations or markdown
+
+COMMAND RULES:
+{_COMMAND_GUIDELINES}"""
+
+
+class PromptTemplates:
+    """Collection of prompt templates for AI interactions."""
+    
+    @staticmethod
+    def command_generation(system_info: SystemInfo) -> str:
+        """
+        Generate system prompt for command generation.
+        
+        The prompt must stay byte-identical for a given system (no timestamps or
+        other per-call data) so both the API's prompt-prefix cache and the local
+        response cache can reuse it across the calls of a run. The static rules
+        come first and the system details last, so even runs on other systems or
+        in other directories share the rules as a cached prefix.
+        """
+        return PromptTemplates._command_generation(
+            system_info.os, system_info.release, system_info.machine, system_info.shell, system_info.cwd
+        )
+
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _command_generation(os_name: str, release: str, machine: str, shell: str, cwd: str) -> str:
+        """Build the command generation prompt, cached since system info is fixed for a run."""
+        return f"""{_COMMAND_GENERATION_RULES}
+
+SYSTEM INFORMATION:
+- Operating System: {os_name} {release}
+- Architecture: {machine}
+- Shell: {shell}
+- Current Directory: {cwd}"""
+
     @staticmethod
     def file_content_generation(system_info: SystemInfo, filename: str, current_content: str = "") -> str:
         """Generate system prompt for file content creation."""
@@ -80,29 +116,41 @@ INSTRUCTIONS:
 """
 
     @staticmethod
-    def continuation_analysis(system_info: SystemInfo) -> str:
-        """Generate system prompt for analyzing if more commands are needed."""
-        return f"""You are analyzing whether enough information has been gathered to answer a user's request.
-
-System: {system_info.os} {system_info.release}
+    def next_step(system_info: SystemInfo) -> str:
+        """Generate system prompt for deciding whether to continue and with which command, as JSON."""
+        return PromptTemplates._next_step(
+            system_info.os, system_info.release, system_info.machine, system_info.shell, system_info.cwd
+        )
 
-Respond with either:
-- "CONTINUE" if more commands are needed to fully answer the request
-- "DONE" if enough information has been gathered
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _next_step(os_name: str, release: str, machine: str, shell: str, cwd: str) -> str:
+        """Build the next step prompt, cached since system info is fixed for a run."""
+        return f"""{_NEXT_STEP_RULES}
 
-Be practical - don't continue if you have sufficient information to provide a helpful answer."""
+SYSTEM INFORMATION:
+- Operating System: {os_name} {release}
+- Architecture: {machine}
+- Shell: {shell}
+- Current Directory: {cwd}"""
 
     @staticmethod
     def explanation_generation(system_info: SystemInfo, verbose: bool = False) -> str:
         """Generate system prompt for explaining command results."""
+        return PromptTemplates._explanation_generation(system_info.os, system_info.release, verbose)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _explanation_generation(os_name: str, release: str, verbose: bool) -> str:
+        """Build the explanation prompt, cached per system and verbosity."""
         if verbose:
             return f"""You are a helpful assistant explaining command results to users.
             
-System: {system_info.os} {system_info.release}
-            
 Provide a clear, detailed explanation of what was accomplished through the series of commands.
 Be helpful and educational. If there were errors, suggest what might have gone wrong.
-Structure your response to show the progression of steps taken."""
+Structure your response to show the progression of steps taken.
+
+System: {os_name} {release}"""
         else:
             return """You are a helpful assistant providing brief, clear summaries.
             
@@ -2,21 +2,18 @@
 
 import os
 import sys
-from typing import List
+from typing import TYPE_CHECKING, List, Optional
 
 import typer
 from rich.console import Console
 from rich.prompt import Confirm
-from dotenv import load_dotenv
 
 from .ai import AIClient
-from .commands import CommandExecutor, CommandResult, CommandGenerator, CommandSafetyChecker
-from .files import FileEditor
+from .commands import CommandExecutor, CommandResult, CommandFixer, CommandGenerator, CommandSafetyChecker
 from .system import SystemInfo
-from .ui import DisplayManager
 
-# Load environment variables
-load_dotenv()
+if TYPE_CHECKING:
+    from .files import FileEditor
 
 # Initialize Typer app and Rich console
 app = typer.Typer()
@@ -26,23 +23,34 @@ console = Console()
 class GhostApp:
     """Main Ghost application orchestrator."""
     
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
         """Initialize the Ghost application."""
+        # Imported here so `--help` and argument errors don't pay for the UI modules
+        from .ui import DisplayManager
+        
         self.console = console
         self.display = DisplayManager(console)
         
         # Initialize AI client
         try:
-            self.ai_client = AIClient()
+            self.ai_client = AIClient(use_cache=use_cache)
         except ValueError as e:
             self.display.show_error(str(e))
             sys.exit(1)
         
         # Initialize components
         self.command_generator = CommandGenerator(self.ai_client)
-        self.file_editor = FileEditor(self.ai_client, console)
+        self._file_editor: Optional["FileEditor"] = None
         self.command_executor = CommandExecutor()
         self.safety_checker = CommandSafetyChecker()
+    
+    @property
+    def file_editor(self) -> "FileEditor":
+        """File editor, created on first use since most runs never edit files."""
+        if self._file_editor is None:
+            from .files import FileEditor
+            self._file_editor = FileEditor(self.ai_client, self.console)
+        return self._file_editor
 
     def run(
         self,
@@ -57,17 +65,25 @@ class GhostApp:
         # Get system information
         system_info = SystemInfo.get_current()
         command_history: List[CommandResult] = []
+        # Whether any command in the history succeeded, kept up to date as it grows
+        overall_success = False
         
         self.display.show_header(prompt)
         
         if verbose:
             self.display.show_system_info(system_info)
 
+        # Next command returned together with the previous continuation decision
+        next_command: Optional[str] = None
+        
         # Main command execution loop
         while len(command_history) < max_commands:
             # Get next command with spinner
-            with self.display.show_spinner("AI is generating command", "dots12", show_completion=False):
-                command = self.command_generator.generate_command(prompt, system_info, command_history)
+            if next_command is not None:
+                command, next_command = next_command, None
+            else:
+                with self.display.show_spinner("AI is generating command", "dots12", show_completion=False):
+                    command = self.command_generator.generate_command(prompt, system_info, command_history)
             
             # Check if this is a file editing command
             is_edit, filename = self.safety_checker.is_file_edit_command(command)
@@ -80,6 +96,7 @@ class GhostApp:
                         stderr="",
                         returncode=0
                     ))
+                    overall_success = True
                     self.display.show_success(f"File editing completed for {filename}")
                 else:
                     self.display.show_warning(f"File editing cancelled for {filename}")
@@ -108,11 +125,17 @@ class GhostApp:
                 if self._attempt_retry(command, prompt, system_info, command_history, force):
                     # Update the last result with the retry result
                     pass  # The retry logic updates the history in place
+            overall_success = overall_success or command_history[-1].success
+            # The command may have changed directory, which later prompts must reflect
+            system_info = SystemInfo.get_current()
             
             # Check if we should continue (skip for file operations)
             if not is_edit:
+                # One AI call decides whether to continue and returns the next command
                 with self.display.show_spinner("AI is analyzing progress", "dots6", show_completion=False):
-                    should_continue_flag, reason = self.command_generator.should_continue(prompt, command_history, system_info)
+                    should_continue_flag, reason, next_command = self.command_generator.next_step(
+                        prompt, command_history, system_info
+                    )
                 
                 if not should_continue_flag:
                     if verbose:
@@ -120,7 +143,7 @@ class GhostApp:
                     break
         
         # Show final results
-        self._show_final_results(prompt, command_history, system_info, verbose)
+        self._show_final_results(prompt, command_history, system_info, verbose, overall_success)
 
     def _handle_file_edit(self, command: str, filename: str, prompt: str, system_info: SystemInfo) -> bool:
         """Handle file editing operations."""
@@ -164,6 +187,13 @@ class GhostApp:
         """Attempt to retry with an alternative command."""
         self.display.show_command_failed_retry()
         
+        # Predictable failures are fixed locally, and the AI is only asked if that fails too
+        local_command = CommandFixer.suggest_fix(failed_command, command_history[-1].stderr, force)
+        if local_command is not None and self._run_alternative(local_command, command_history, force):
+            if command_history[-1].success:
+                return True
+            failed_command = local_command
+        
         # Get alternative command with spinner
         with self.display.show_spinner("AI is finding alternative", "dots10"):
             alt_command = self.command_generator.generate_command(
@@ -171,39 +201,45 @@ class GhostApp:
             )
         
         if alt_command != failed_command:  # Only retry if we got a different command
-            self.display.show_alternative_command(alt_command)
+            return self._run_alternative(alt_command, command_history, force)
+        
+        return False
+    
+    def _run_alternative(self, alt_command: str, command_history: List[CommandResult], force: bool) -> bool:
+        """Run an alternative command in place of the last one in the history."""
+        self.display.show_alternative_command(alt_command)
             
-            # Check safety again
-            if not self._check_command_safety(alt_command, force):
-                return False
+        # Check safety again
+        if not self._check_command_safety(alt_command, force):
+            return False
             
-            # Check if alternative is also a file edit command
-            alt_is_edit, _ = self.safety_checker.is_file_edit_command(alt_command)
-            alt_result = self._execute_command(alt_command, alt_is_edit)
+        # Check if alternative is also a file edit command
+        alt_is_edit, _ = self.safety_checker.is_file_edit_command(alt_command)
+        alt_result = self._execute_command(alt_command, alt_is_edit)
             
-            # Replace the failed command with the alternative
-            command_history[-1] = alt_result
+        # Replace the failed command with the alternative
+        command_history[-1] = alt_result
             
-            # Show alternative results
-            self.display.show_command_results(alt_result, verbose=True)
-            return True
-        
-        return False
+        # Show alternative results
+        self.display.show_command_results(alt_result, verbose=True)
+        return True
 
     def _show_final_results(
         self, 
         prompt: str, 
         command_history: List[CommandResult], 
         system_info: SystemInfo, 
-        verbose: bool
+        verbose: bool,
+        overall_success: bool
     ):
         """Show the final results and explanation."""
         if command_history:
-            with self.display.show_spinner("AI is summarizing results", "dots8", show_completion=False):
-                explanation = self.command_generator.generate_explanation(
-                    prompt, command_history, system_info, verbose
-                )
-            self.display.show_final_results(explanation, command_history)
+            chunks = self.command_generator.generate_explanation(
+                prompt, command_history, system_info, verbose, stream=True
+            )
+            streamed = self.display.show_streamed_text(chunks, "AI is summarizing results", "dots8")
+            explanation = self.ai_client.clean_response(streamed)
+            self.display.show_final_results(explanation, overall_success)
         else:
             self.display.show_no_commands_executed()
 
@@ -235,10 +271,21 @@ def main(
         5,
         "--max-commands",
         help="Maximum number of commands to execute"
+    ),
+    cache: bool = typer.Option(
+        True,
+        "--cache/--no-cache",
+        help="Reuse cached AI responses for repeated requests"
     )
 ):
     """
     Execute commands based on natural language prompts using AI.
     """
-    ghost_app = GhostApp()
-    ghost_app.run(prompt, verbose, dry_run, force, retry, max_commands) 
\ No newline at end of file
+    # Load environment variables, unless the API key is already set
+    if os.getenv("OPENAI_API_KEY") is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+    
+    ghost_app = GhostApp(use_cache=cache)
+    with ghost_app.ai_client:
+        ghost_app.run(prompt, verbose, dry_run, force, retry, max_commands) 
\ No newline at end of file
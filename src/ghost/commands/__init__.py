@@ -2,6 +2,7 @@
 
 from .executor import CommandExecutor, CommandResult
 from .generator import CommandGenerator
+from .retry import CommandFixer
 from .safety import CommandSafetyChecker
 
-__all__ = ["CommandExecutor", "CommandResult", "CommandGenerator", "CommandSafetyChecker"] 
\ No newline at end of file
+__all__ = ["CommandExecutor", "CommandResult", "CommandGenerator", "CommandSafetyChecker", "CommandFixer"] 
\ No newline at end of file
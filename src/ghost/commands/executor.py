@@ -1,18 +1,51 @@
 """Command execution utilities."""
 
+import atexit
+import os
+import re
+import shlex
+import signal
 import subprocess
-from typing import Tuple, NamedTuple
+from typing import Optional, Tuple
 from dataclasses import dataclass
 
+from .shell import PersistentShell, capture_output
 
-@dataclass
+
+# Length of the output excerpts used when building AI prompts
+SHORT_OUTPUT_LENGTH = 300
+
+# Commands that may prompt for a password on the terminal, which a new session doesn't have
+TERMINAL_COMMAND_RE = re.compile(r"\bsudo\b")
+
+# Characters that need a shell to interpret them (pipes, redirects, expansions, ...)
+SHELL_METACHARACTERS = frozenset("|&;<>()$`*?[]{}~#\n")
+
+
+@dataclass(frozen=True)
 class CommandResult:
     """Result of a command execution."""
+    # Declared by hand rather than with slots=True, which needs Python 3.10;
+    # stdout_short and stderr_short are derived in __post_init__, not fields
+    __slots__ = ("command", "stdout", "stderr", "returncode", "stdout_short", "stderr_short")
+    
     command: str
     stdout: str
     stderr: str
     returncode: int
     
+    def __post_init__(self):
+        """Truncate the output once for every prompt that includes it."""
+        object.__setattr__(self, "stdout_short", self._shorten(self.stdout))
+        object.__setattr__(self, "stderr_short", self._shorten(self.stderr))
+    
+    @staticmethod
+    def _shorten(output: str) -> str:
+        """Cut output down to a prompt-sized excerpt."""
+        if len(output) <= SHORT_OUTPUT_LENGTH:
+            return output
+        return output[:SHORT_OUTPUT_LENGTH] + "..."
+    
     @property
     def success(self) -> bool:
         """Check if command was successful."""
@@ -24,24 +57,21 @@ class CommandExecutor:
     
     DEFAULT_TIMEOUT = 30
     
+    # Shell shared by every command in the process, started on first use
+    _shell: Optional[PersistentShell] = None
+    
     @classmethod
     def execute(cls, command: str, timeout: int = None) -> CommandResult:
         """Execute a shell command with timeout."""
         timeout = timeout or cls.DEFAULT_TIMEOUT
         
         try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                text=True,
-                capture_output=True,
-                timeout=timeout
-            )
+            stdout, stderr, returncode = cls._run(command, timeout)
             return CommandResult(
                 command=command,
-                stdout=result.stdout,
-                stderr=result.stderr,
-                returncode=result.returncode
+                stdout=stdout,
+                stderr=stderr,
+                returncode=returncode
             )
         except subprocess.TimeoutExpired:
             return CommandResult(
@@ -62,17 +92,12 @@ class CommandExecutor:
     def execute_no_timeout(cls, command: str) -> CommandResult:
         """Execute a shell command without timeout (for file operations)."""
         try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                text=True,
-                capture_output=True
-            )
+            stdout, stderr, returncode = cls._run(command, None)
             return CommandResult(
                 command=command,
-                stdout=result.stdout,
-                stderr=result.stderr,
-                returncode=result.returncode
+                stdout=stdout,
+                stderr=stderr,
+                returncode=returncode
             )
         except Exception as e:
             return CommandResult(
@@ -80,4 +105,80 @@ class CommandExecutor:
                 stdout="",
                 stderr=f"Error executing command: {str(e)}",
                 returncode=1
-            ) 
\ No newline at end of file
+            ) 
+    
+    @classmethod
+    def _run(cls, command: str, timeout: Optional[int]) -> Tuple[str, str, int]:
+        """Run a command in the shared shell, falling back to a one-off process if it is unavailable."""
+        if TERMINAL_COMMAND_RE.search(command):
+            return cls._run_once(command, timeout, new_session=False)
+        
+        shell = cls._get_shell()
+        if shell is not None:
+            try:
+                output = shell.run(command, timeout)
+            except OSError:
+                # The shell could not be started or died before reading the command
+                shell.close()
+            else:
+                cls._follow_cwd(shell.cwd)
+                return output
+        
+        return cls._run_once(command, timeout)
+    
+    @staticmethod
+    def _run_once(command: str, timeout: Optional[int], new_session: bool = True) -> Tuple[str, str, int]:
+        """Run a command in its own process, in a new session unless it needs the terminal."""
+        options = dict(stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=new_session)
+        
+        proc, direct = None, False
+        if not new_session and SHELL_METACHARACTERS.isdisjoint(command):
+            try:
+                argv = shlex.split(command)
+                if argv and argv[0] == "sudo":
+                    # Run sudo itself rather than a shell around it, so the signal sent on
+                    # a timeout reaches sudo, which passes it on to the command
+                    proc, direct = subprocess.Popen(argv, **options), True
+            except (ValueError, OSError):
+                # Unbalanced quotes or no sudo on the PATH; let the shell handle and report it
+                proc = None
+        if proc is None:
+            proc = subprocess.Popen(command, shell=True, **options)
+        
+        def kill():
+            """Stop the process, with anything it started when it leads its own session."""
+            if new_session:
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                    return
+                except (AttributeError, OSError):
+                    pass
+            # Sharing our process group, only the process itself can be signalled
+            if direct:
+                proc.terminate()
+            else:
+                proc.kill()
+        
+        stdout, stderr = capture_output(proc, timeout, kill)
+        # Report death by a signal as a shell would (128 + signal number)
+        returncode = proc.returncode if proc.returncode >= 0 else 128 - proc.returncode
+        return stdout, stderr, returncode
+    
+    @staticmethod
+    def _follow_cwd(cwd: Optional[str]):
+        """Move into the shell's directory so prompts, file edits and one-off commands use it too."""
+        if cwd is None:
+            return
+        try:
+            os.chdir(cwd)
+        except OSError:
+            # The directory was removed or can't be entered; stay where we are
+            pass
+    
+    @classmethod
+    def _get_shell(cls) -> Optional[PersistentShell]:
+        """Return the shared shell, creating it on first use where supported."""
+        if cls._shell is None and PersistentShell.is_supported():
+            cls._shell = PersistentShell()
+            atexit.register(cls._shell.close)
+        return cls._shell
\ No newline at end of file
@@ -1,14 +1,31 @@
 """Command generation using AI."""
 
-from typing import List, Optional, Tuple
+import json
+import re
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from ..ai import AIClient, PromptTemplates
 from ..system import SystemInfo
 from .executor import CommandResult
 
 
+# Most output, per stream, sent when a prompt needs a command's full output
+FULL_OUTPUT_LENGTH = 2000
+
+
 class CommandGenerator:
     """Generates shell commands using AI."""
     
+    # Requests that only ask to see something, and words that mean more than that
+    INFO_REQUEST_RE = re.compile(
+        r'^\s*(?:show|list|find|what|which|where|who|how (?:many|much|big)|check|count|display|get|print|is|are)\b',
+        re.IGNORECASE
+    )
+    ACTION_RE = re.compile(
+        r'\b(?:and|then|install|create|make|move|copy|delete|remove|rename|set ?up|organi[sz]e|convert|'
+        r'compress|backup|back up|update|upgrade|kill|change|edit|write|fix|clean|download|send|start|stop)\b',
+        re.IGNORECASE
+    )
+    
     def __init__(self, ai_client: AIClient):
         """Initialize the command generator."""
         self.ai_client = ai_client
@@ -24,32 +41,59 @@ class CommandGenerator:
         
         system_prompt = PromptTemplates.command_generation(system_info)
         
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": prompt}
-        ]
-        
         # Add command history context if available
-        if command_history:
-            history_text = self._format_command_history(command_history)
-            messages.append({"role": "user", "content": history_text})
-        
-        if previous_attempt:
-            messages.append({
-                "role": "user", 
-                "content": f"Previous command failed: {previous_attempt}\nPlease suggest a better alternative."
-            })
+        history_text = self._format_command_history(command_history) if command_history else ""
+        retry_text = (f"Previous command failed: {previous_attempt}\nPlease suggest a better alternative."
+                      if previous_attempt else "")
+        
+        messages = self._build_messages(system_prompt, prompt, history_text, retry_text)
 
         return self.ai_client.generate_completion(messages)
 
-    def should_continue(
+    def next_step(
         self,
         prompt: str,
         command_history: List[CommandResult],
         system_info: SystemInfo
-    ) -> Tuple[bool, str]:
-        """Determine if more commands are needed to fully answer the request."""
-        
+    ) -> Tuple[bool, str, Optional[str]]:
+        """
+        Determine if more commands are needed and, if so, which one comes next.
+        
+        Both are answered by a single JSON completion. Returns whether to continue,
+        the reason, and the next command; the command is None when the decision
+        was made locally or the reply had none, so the caller generates it.
+        """
+        
+        decision = self.local_decision(prompt, command_history)
+        if decision is not None:
+            return decision[0], decision[1], None
+        
+        system_prompt = PromptTemplates.next_step(system_info)
+        
+        messages = self._build_messages(
+            system_prompt,
+            f"Original request: {prompt}",
+            f"Commands executed so far:\n{self._format_results(command_history, short=True)}",
+            "Do we have enough information to answer the original request, or what is the next command?"
+        )
+
+        reply = self.ai_client.generate_completion(messages, temperature=0, max_tokens=200, json_mode=True)
+        try:
+            step = json.loads(reply)
+        except ValueError:
+            step = None
+        if not isinstance(step, dict):
+            return True, "Could not read the next step", None
+        
+        should_continue_flag = not step.get("done")
+        reason = str(step.get("reason") or ("Request answered" if not should_continue_flag else "More commands needed"))
+        command = step.get("command")
+        if not should_continue_flag or not isinstance(command, str):
+            return should_continue_flag, reason, None
+        return True, reason, self.ai_client.clean_response(command) or None
+    
+    def local_decision(self, prompt: str, command_history: List[CommandResult]) -> Optional[Tuple[bool, str]]:
+        """Decide whether to continue without the AI when the answer is predictable, else return None."""
         if not command_history:
             return True, "No commands executed yet"
         
@@ -64,71 +108,86 @@ class CommandGenerator:
             "permission denied" in last_result.stderr.lower()):
             return False, "Permission denied - cannot continue"
         
-        system_prompt = PromptTemplates.continuation_analysis(system_info)
-        
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Original request: {prompt}\n\nCommands executed so far:"}
-        ]
+        # A single-step question is answered once a command has printed a result
+        if (last_result.success and last_result.stdout.strip() and
+                self.INFO_REQUEST_RE.search(prompt) and not self.ACTION_RE.search(prompt)):
+            return False, "Information request answered"
         
-        for i, result in enumerate(command_history, 1):
-            status = "successful" if result.success else "failed"
-            messages.append({
-                "role": "user", 
-                "content": f"Command {i}: {result.command} ({status})\nOutput: {result.stdout[:300] if result.stdout else '(no output)'}\nErrors: {result.stderr[:200] if result.stderr else '(no errors)'}"
-            })
-        
-        messages.append({
-            "role": "user",
-            "content": "Do we have enough information to answer the original request, or should we continue with more commands?"
-        })
-
-        decision = self.ai_client.generate_completion(messages, max_tokens=50)
-        should_continue_flag = decision.upper().startswith("CONTINUE")
-        
-        return should_continue_flag, decision
+        return None
 
     def generate_explanation(
         self,
         prompt: str,
         command_history: List[CommandResult],
         system_info: SystemInfo,
-        verbose: bool = False
-    ) -> str:
-        """Generate explanation of what was accomplished."""
+        verbose: bool = False,
+        stream: bool = False
+    ) -> Union[str, Iterator[str]]:
+        """Generate explanation of what was accomplished, optionally as a stream of text chunks."""
         
         system_prompt = PromptTemplates.explanation_generation(system_info, verbose)
         
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": f"Original request: {prompt}\n\nCommands executed:"}
-        ]
-        
-        for i, result in enumerate(command_history, 1):
-            status = "successful" if result.success else "failed"
-            messages.append({
-                "role": "user", 
-                "content": f"Command {i}: {result.command} ({status})\nOutput: {result.stdout if result.stdout else '(no output)'}\nErrors: {result.stderr if result.stderr else '(no errors)'}"
-            })
-        
         explanation_prompt = ("Please provide a detailed explanation of what was accomplished and what the results mean." 
                             if verbose else 
                             "Please provide a concise summary answering the original request.")
         
-        messages.append({"role": "user", "content": explanation_prompt})
+        # The summary answers from the outputs themselves, so they are sent in full
+        messages = self._build_messages(
+            system_prompt,
+            f"Original request: {prompt}",
+            f"Commands executed:\n{self._format_results(command_history, short=False)}",
+            explanation_prompt
+        )
 
         max_tokens = 400 if verbose else 150
-        return self.ai_client.generate_completion(messages, max_tokens=max_tokens)
+        return self.ai_client.generate_completion(messages, max_tokens=max_tokens, stream=stream)
 
     def _format_command_history(self, command_history: List[CommandResult]) -> str:
         """Format command history for inclusion in prompts."""
-        history_text = "Previous commands executed:\n"
+        parts = ["Previous commands executed:\n"]
         for i, result in enumerate(command_history, 1):
             status = "SUCCESS" if result.success else "FAILED"
-            history_text += f"{i}. {result.command} [{status}]\n"
+            parts.append(f"{i}. {result.command} [{status}]\n")
             if result.stdout:
-                history_text += f"   Output: {result.stdout[:200]}{'...' if len(result.stdout) > 200 else ''}\n"
+                parts.append(f"   Output: {result.stdout_short}\n")
             if result.stderr:
-                history_text += f"   Error: {result.stderr[:100]}{'...' if len(result.stderr) > 100 else ''}\n"
+                parts.append(f"   Error: {result.stderr_short}\n")
         
-        return history_text 
\ No newline at end of file
+        return "".join(parts)
+    
+    @staticmethod
+    def _build_messages(system_prompt: str, *sections: str) -> List[Dict[str, str]]:
+        """
+        Assemble a request as exactly one system and one user message.
+        
+        Sections are given from most to least stable (request, history, question),
+        so successive calls in a run share the longest possible prompt prefix.
+        """
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": "\n\n".join(section for section in sections if section)}
+        ]
+    
+    @staticmethod
+    def _format_results(command_history: List[CommandResult], short: bool) -> str:
+        """Format command results as one block for a single prompt message."""
+        blocks = []
+        for i, result in enumerate(command_history, 1):
+            status = "successful" if result.success else "failed"
+            stdout = result.stdout_short if short else CommandGenerator._excerpt(result.stdout)
+            stderr = result.stderr_short if short else CommandGenerator._excerpt(result.stderr)
+            blocks.append(
+                f"Command {i}: {result.command} ({status})\n"
+                f"Output: {stdout if stdout else '(no output)'}\n"
+                f"Errors: {stderr if stderr else '(no errors)'}"
+            )
+        # A fixed separator keeps earlier entries byte-identical as the history grows
+        return "\n---\n".join(blocks)
+    
+    @staticmethod
+    def _excerpt(output: str, limit: int = FULL_OUTPUT_LENGTH) -> str:
+        """Cap output for a prompt, keeping its head and tail where results usually are."""
+        if len(output) <= limit:
+            return output
+        half = limit // 2
+        return f"{output[:half]}\n...[{len(output) - limit} chars truncated]...\n{output[-half:]}" 
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""Local fixes for predictable command failures."""
+
+import re
+import shutil
+from typing import Match, Optional
+
+# apt's assume-yes flags, which brew rejects
+_APT_YES_RE = re.compile(r'\s+(?:-y|--yes|--assume-yes)(?=\s|$)')
+
+
+def _apt_to_brew(match: Match[str]) -> str:
+    """Rewrite an apt install/remove/search as the brew equivalent."""
+    return f"brew {match.group(1)}{_APT_YES_RE.sub('', match.group(2))}"
+
+
+class CommandFixer:
+    """Rewrites failed commands whose fix is predictable, without asking the AI."""
+    
+    # (error pattern, pattern in the command, replacement string or function, tool the replacement needs)
+    FIXUPS = [
+        (
+            r'\bapt(?:-get)?: (?:command )?not found|command not found: apt',
+            r'(?:sudo\s+)?(?<![\w./-])apt(?:-get)?(?![\w-])\s+(install|remove|search)\b([^;&|]*)',
+            _apt_to_brew,
+            'brew'
+        ),
+        (r'\bpython: (?:command )?not found|command not found: python\b', r'(?<![\w./-])python(?![\w.-])', 'python3', 'python3'),
+        (r'\bpip: (?:command )?not found|command not found: pip\b', r'(?<![\w./-])pip(?![\w.-])', 'pip3', 'pip3'),
+    ]
+    
+    _FIXUP_RES = [
+        (re.compile(error), re.compile(target), replacement, tool)
+        for error, target, replacement, tool in FIXUPS
+    ]
+    _PERMISSION_RE = re.compile(r'permission denied|operation not permitted', re.IGNORECASE)
+    
+    @classmethod
+    def suggest_fix(cls, command: str, stderr: str, force: bool = False) -> Optional[str]:
+        """Return a locally rewritten command for a known failure, or None if the AI is needed."""
+        for error_re, target_re, replacement, tool in cls._FIXUP_RES:
+            if error_re.search(stderr) and shutil.which(tool):
+                fixed = target_re.sub(replacement, command)
+                return fixed if fixed != command else None
+        
+        # Escalating privileges is only done unprompted when the user passed --force
+        if (force and cls._PERMISSION_RE.search(stderr) and
+                not command.startswith('sudo ') and shutil.which('sudo')):
+            return f"sudo {command}"
+        
+        return None 
\ No newline at end of file
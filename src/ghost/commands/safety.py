@@ -39,51 +39,52 @@ class CommandSafetyChecker:
         r'echo\s+.*>\s*(\S+)',
         r'tee\s+(\S+)',
     ]
+    
+    # Commands that FILE_EDIT_PATTERNS can match without a '>' ('vi' covers vim)
+    FILE_EDIT_COMMANDS = ('nano', 'vi', 'emacs', 'code', 'touch', 'cat', 'echo', 'tee')
+    
+    SUSPICIOUS_REDIRECTS = ['> /', '>> /', '> /dev/', '>> /dev/']
+    
+    # Each pattern list compiled into one alternation so a check is a single regex scan
+    _DANGER_RE = re.compile('|'.join(map(re.escape, DANGEROUS_PATTERNS + SUSPICIOUS_REDIRECTS)), re.IGNORECASE)
+    _EDIT_RE = re.compile('|'.join(FILE_EDIT_PATTERNS), re.IGNORECASE)
+    # Any of those names at the start of a word, so "service" or "decode" don't pass
+    _EDIT_COMMAND_RE = re.compile(r'\b(?:' + '|'.join(FILE_EDIT_COMMANDS) + ')', re.IGNORECASE)
+    # Target of the last redirection in a command
+    _REDIRECT_RE = re.compile(r'>\s*([^>]+?)\s*$')
+    _FILENAME_TBL = str.maketrans('', '', '"\'`{}')
 
     @classmethod
     def is_potentially_dangerous(cls, command: str) -> bool:
         """Check if a command is potentially dangerous."""
-        command_lower = command.lower()
-        
-        for pattern in cls.DANGEROUS_PATTERNS:
-            if pattern in command_lower:
-                return True
-        
-        # Check for suspicious redirects
-        if any(redirect in command for redirect in ['> /', '>> /', '> /dev/', '>> /dev/']):
-            return True
-            
-        return False
+        return cls._DANGER_RE.search(command) is not None
 
     @classmethod
     def is_file_edit_command(cls, command: str) -> Tuple[bool, Optional[str]]:
         """Check if command is for file creation/editing and extract filename."""
-        command_lower = command.lower().strip()
+        # Most commands are not file edits; skip the pattern scan when none can match
+        if '>' not in command and not cls._EDIT_COMMAND_RE.search(command):
+            return False, None
         
-        # Check file editing patterns
-        for pattern in cls.FILE_EDIT_PATTERNS:
-            match = re.search(pattern, command_lower)
-            if match:
-                filename = match.group(1).strip()
-                filename = cls._clean_filename(filename)
-                if filename:
-                    return True, filename
+        # Check file editing patterns; each alternative has exactly one filename group
+        for match in cls._EDIT_RE.finditer(command):
+            filename = next(group for group in match.groups() if group is not None).strip()
+            filename = cls._clean_filename(filename)
+            if filename:
+                return True, filename
         
         # Check for redirection to files
-        if '>' in command and not any(dangerous in command for dangerous in ['> /', '> /dev/']):
-            parts = command.split('>')
-            if len(parts) >= 2:
-                filename = parts[-1].strip()
-                filename = cls._clean_filename(filename)
+        if '>' in command and '> /' not in command:
+            match = cls._REDIRECT_RE.search(command)
+            if match:
+                filename = cls._clean_filename(match.group(1))
                 if filename and not filename.startswith('/dev/'):
                     return True, filename
         
         return False, None
 
-    @staticmethod
-    def _clean_filename(filename: str) -> str:
+    @classmethod
+    def _clean_filename(cls, filename: str) -> str:
         """Clean up filename from command parsing."""
-        # Remove quotes and unwanted characters
-        filename = filename.replace('"', '').replace("'", "").replace('`', '')
-        filename = filename.replace('{{response_code}}', '').replace('{{', '').replace('}}', '')
-        return filename.strip() 
\ No newline at end of file
+        # Remove template placeholders, quotes and braces
+        return filename.replace('{{response_code}}', '').translate(cls._FILENAME_TBL).strip() 
\ No newline at end of file
@@ -0,0 +1,249 @@
+"""Shell processes for command execution, with their output capped."""
+
+import os
+import selectors
+import shlex
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+
+# Output kept per stream; anything beyond is dropped so huge outputs can't exhaust memory
+MAX_OUTPUT_BYTES = 65536
+TRUNCATION_NOTICE = "\n...(output truncated)"
+
+
+def capture_output(proc: subprocess.Popen, timeout: Optional[float], kill: Callable[[], None]) -> Tuple[str, str]:
+    """
+    Read a process's stdout and stderr to the end, keeping at most MAX_OUTPUT_BYTES of each.
+    
+    Each pipe is drained on its own thread, which works on every platform and
+    never lets a full pipe stall the process. If the pipes are still open or the
+    process is still running after timeout seconds, kill() is called and
+    subprocess.TimeoutExpired raised like subprocess.run would.
+    """
+    buffers = (bytearray(), bytearray())
+    threads = [
+        threading.Thread(target=_drain, args=(pipe, buffer), daemon=True)
+        for pipe, buffer in zip((proc.stdout, proc.stderr), buffers)
+    ]
+    for thread in threads:
+        thread.start()
+    
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        for thread in threads:
+            thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+            if thread.is_alive():
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+        proc.wait(None if deadline is None else max(0, deadline - time.monotonic()))
+    except subprocess.TimeoutExpired:
+        kill()
+        # Anything the process started outside our reach may keep the pipes open
+        grace_end = time.monotonic() + PersistentShell.GRACE_PERIOD
+        for thread in threads:
+            thread.join(max(0, grace_end - time.monotonic()))
+        raise
+    
+    return tuple(_decode(buffer[:MAX_OUTPUT_BYTES], len(buffer) > MAX_OUTPUT_BYTES) for buffer in buffers)
+
+
+def _drain(pipe, buffer: bytearray):
+    """Read a pipe until it closes, keeping one byte past the cap so truncation can be told."""
+    # The pipe is closed here rather than by the caller, whose timeout may leave this thread
+    # reading; its descriptor must not be reused while that is the case
+    with pipe:
+        fd = pipe.fileno()
+        while True:
+            data = os.read(fd, PersistentShell.READ_SIZE)
+            if not data:
+                return
+            room = MAX_OUTPUT_BYTES + 1 - len(buffer)
+            if room > 0:
+                buffer += data[:room]
+
+
+def _decode(data: bytes, truncated: bool = False) -> str:
+    """Decode captured output, tolerating invalid bytes and noting any truncation."""
+    output = data.decode(errors="replace")
+    return output + TRUNCATION_NOTICE if truncated else output
+
+
+class PersistentShell:
+    """
+    A long-lived /bin/sh that runs commands one after another.
+    
+    Reusing one shell avoids a fork/exec of the shell per command and lets
+    state such as the working directory and exported variables carry over
+    between steps. Each command is followed by a unique marker on stdout and
+    stderr so its output and exit code can be told apart from the next one's.
+    The marker also reports the shell's working directory, kept in `cwd` so
+    the caller can follow a `cd` and start any replacement shell in the same place.
+    """
+    
+    SHELL = "/bin/sh"
+    READ_SIZE = 65536
+    # How long to wait for the rest of a command's markers, or for the shell to exit, once one arrived
+    GRACE_PERIOD = 1.0
+    
+    def __init__(self):
+        """Initialize the shell; the process itself is started on first use."""
+        self._proc: Optional[subprocess.Popen] = None
+        # Working directory the shell reported after the last command that completed
+        self.cwd: Optional[str] = None
+    
+    @classmethod
+    def is_supported(cls) -> bool:
+        """Check whether a persistent shell can be used on this platform."""
+        return os.name == "posix" and os.path.exists(cls.SHELL)
+    
+    def run(self, command: str, timeout: Optional[float] = None) -> Tuple[str, str, int]:
+        """
+        Run a command in the shell and return its stdout, stderr and exit code.
+        
+        Each stream is read incrementally and capped at MAX_OUTPUT_BYTES, so the
+        pipes never fill up and stall the command however much it prints.
+        Raises subprocess.TimeoutExpired like subprocess.run, after killing the
+        shell; a fresh one is started for the next command. If the command makes
+        the shell exit (e.g. `exit` or a syntax error), its exit code is returned;
+        if it redirects or closes the shell's own output, the shell is replaced.
+        """
+        if self._proc is None or self._proc.poll() is not None:
+            self._start()
+        proc = self._proc
+        
+        marker = f"__GHOST_EOF_{uuid.uuid4().hex}__"
+        # The command is quoted so unfinished input (e.g. a trailing backslash) can't swallow
+        # the markers, and reads from /dev/null so it can't consume the script that follows
+        script = (
+            f"eval {shlex.quote(command)} </dev/null\n"
+            "__ghost_status=$?\n"
+            f"printf '\\n{marker}%s %s\\n' \"$__ghost_status\" \"$PWD\"\n"
+            f"printf '\\n{marker}%s %s\\n' \"$__ghost_status\" \"$PWD\" >&2\n"
+        )
+        proc.stdin.write(script.encode())
+        proc.stdin.flush()
+        
+        end = f"\n{marker}".encode()
+        buffers: Dict[str, bytearray] = {"stdout": bytearray(), "stderr": bytearray()}
+        scan_from = {"stdout": 0, "stderr": 0}
+        marker_at: Dict[str, int] = {}
+        truncated = {"stdout": False, "stderr": False}
+        deadline = None if timeout is None else time.monotonic() + timeout
+        
+        with selectors.DefaultSelector() as selector:
+            selector.register(proc.stdout, selectors.EVENT_READ, "stdout")
+            selector.register(proc.stderr, selectors.EVENT_READ, "stderr")
+            
+            while selector.get_map():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    if marker_at:
+                        # The other marker went wherever the command sent that stream
+                        break
+                    self.close()
+                    raise subprocess.TimeoutExpired(command, timeout)
+                
+                for key, _ in selector.select(remaining):
+                    stream = key.data
+                    data = os.read(key.fileobj.fileno(), self.READ_SIZE)
+                    if not data:
+                        # The shell exited or the command closed this stream (e.g. `exec >&-`)
+                        selector.unregister(key.fileobj)
+                        continue
+                    
+                    buffer = buffers[stream]
+                    buffer += data
+                    index = buffer.find(end, scan_from[stream])
+                    if index == -1:
+                        if len(buffer) > MAX_OUTPUT_BYTES + len(end):
+                            # Keep the head for the result and just enough tail to spot the marker
+                            del buffer[MAX_OUTPUT_BYTES:len(buffer) - len(end)]
+                            truncated[stream] = True
+                        scan_from[stream] = max(0, len(buffer) - len(end))
+                    elif buffer.find(b"\n", index + len(end)) != -1:
+                        # The marker line is complete and carries the exit code and directory
+                        marker_at[stream] = index
+                        selector.unregister(key.fileobj)
+                        grace_end = time.monotonic() + self.GRACE_PERIOD
+                        deadline = grace_end if deadline is None else min(deadline, grace_end)
+                    else:
+                        scan_from[stream] = index
+        
+        if not marker_at:
+            # Neither marker arrived, so the shell is gone or can no longer report back
+            return self._collect_after_exit(buffers, truncated)
+        
+        stream, index = next(iter(marker_at.items()))
+        tail = buffers[stream][index + len(end):]
+        status, _, cwd = tail[:tail.index(b"\n")].partition(b" ")
+        returncode = int(status)
+        self.cwd = os.fsdecode(bytes(cwd))
+        if len(marker_at) < 2:
+            # The command redirected one of the shell's own streams, so it can't be reused
+            self.close()
+        
+        outputs = []
+        for stream in ("stdout", "stderr"):
+            buffer = buffers[stream]
+            stop = marker_at.get(stream, len(buffer))
+            outputs.append(_decode(buffer[:min(stop, MAX_OUTPUT_BYTES)], truncated[stream] or stop > MAX_OUTPUT_BYTES))
+        return outputs[0], outputs[1], returncode
+    
+    def close(self):
+        """Kill the shell and anything it started."""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        if proc.poll() is None:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except OSError:
+                proc.kill()
+        proc.wait()
+        for pipe in (proc.stdin, proc.stdout, proc.stderr):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+    
+    def _start(self):
+        """Start a new shell in its own process group."""
+        self.close()
+        self._proc = subprocess.Popen(
+            [self.SHELL],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True
+        )
+    
+    def _collect_after_exit(self, buffers: Dict[str, bytearray], truncated: Dict[str, bool]) -> Tuple[str, str, int]:
+        """Drain what the exited shell left behind and return it with the shell's exit code."""
+        proc = self._proc
+        try:
+            # The streams can close a moment before the exit is reported
+            proc.wait(timeout=self.GRACE_PERIOD)
+        except subprocess.TimeoutExpired:
+            # Still running with both streams closed; it is killed below
+            pass
+        # Anything left in the process group could hold the pipes open forever
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        for stream in ("stdout", "stderr"):
+            buffer = buffers[stream]
+            buffer += getattr(proc, stream).read(max(0, MAX_OUTPUT_BYTES + 1 - len(buffer)))
+            if len(buffer) > MAX_OUTPUT_BYTES:
+                del buffer[MAX_OUTPUT_BYTES:]
+                truncated[stream] = True
+        self.close()
+        return (
+            _decode(buffers["stdout"], truncated["stdout"]),
+            _decode(buffers["stderr"], truncated["stderr"]),
+            proc.returncode
+        )
\ No newline at end of file
@@ -1,16 +1,88 @@
 """File editing with AI assistance."""
 
-import difflib
+import functools
+import itertools
+import os
+import re
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 from rich.console import Console
 from rich.prompt import Confirm, Prompt
 from rich.panel import Panel
-from rich.syntax import Syntax
+from rich.text import Text
 
 from ..ai import AIClient, PromptTemplates
 from ..system import SystemInfo
+from ..ui import DisplayManager
+
+
+# Syntax highlighting language by file extension
+_LANG_MAP = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.ts': 'typescript',
+    '.html': 'html',
+    '.css': 'css',
+    '.json': 'json',
+    '.yaml': 'yaml',
+    '.yml': 'yaml',
+    '.sh': 'bash',
+    '.md': 'markdown',
+    '.sql': 'sql',
+    '.xml': 'xml',
+    '.toml': 'toml',
+    '.ini': 'ini',
+    '.conf': 'ini',
+    '.txt': 'text'
+}
+
+# Longest diff shown before the rest is cut off
+MAX_DIFF_LINES = 2000
+# Unchanged lines shown around each change, as in difflib's default
+DIFF_CONTEXT = 3
+_HUNK_RE = re.compile(r"^@@ -(\d+)(,\d+)? \+(\d+)(,\d+)? @@")
+
+# Files are read and written as raw bytes (no newline translation on Windows)
+_O_BINARY = getattr(os, "O_BINARY", 0)
+_READ_SIZE = 1 << 20
+# Times a failed save may be retried before giving up
+MAX_SAVE_ATTEMPTS = 5
+
+
+def _read_file(path: Path) -> str:
+    """Read a whole file as UTF-8 with unbuffered reads, usually a single one."""
+    fd = os.open(path, os.O_RDONLY | _O_BINARY)
+    try:
+        chunks = []
+        # Ask for one byte more than the file size so a single read can also see EOF
+        size = os.fstat(fd).st_size + 1
+        while True:
+            chunk = os.read(fd, size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size = _READ_SIZE
+    finally:
+        os.close(fd)
+    return b"".join(chunks).decode("utf-8")
+
+
+def _write_file(path: Path, content: str):
+    """Write a whole file as UTF-8 with unbuffered writes, replacing what was there."""
+    data = memoryview(content.encode("utf-8"))
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | _O_BINARY, 0o644)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
+
+@functools.lru_cache(maxsize=32)
+def _language_for(filename: str) -> str:
+    """Detect the highlighting language of a file from its extension."""
+    return _LANG_MAP.get(Path(filename).suffix.lower(), 'text')
 
 
 class FileEditor:
@@ -20,6 +92,7 @@ class FileEditor:
         """Initialize the file editor."""
         self.ai_client = ai_client
         self.console = console
+        self.display = DisplayManager(console)
 
     def interactive_edit(self, prompt: str, filename: str, system_info: SystemInfo) -> bool:
         """Interactive file editing mode with AI assistance."""
@@ -31,7 +104,7 @@ class FileEditor:
         
         if file_path.exists():
             try:
-                current_content = file_path.read_text()
+                current_content = _read_file(file_path)
                 self.console.print(f"[green]Found existing file[/green]")
                 self._show_file_content(current_content, filename)
             except Exception as e:
@@ -42,7 +115,6 @@ class FileEditor:
         
         # Generate initial content
         if not current_content:
-            self.console.print("[dim]Generating initial content...[/dim]")
             new_content = self._generate_file_content(prompt, filename, current_content, system_info)
             self._show_file_content(new_content, filename)
             current_content = new_content
@@ -67,7 +139,9 @@ class FileEditor:
                 self._show_file_content(current_content, filename)
             
             elif choice == "4":
-                return self._exit_without_saving()
+                # Declining the confirmation goes back to the menu
+                if self._exit_without_saving():
+                    return False
 
     def _generate_file_content(self, prompt: str, filename: str, current_content: str, system_info: SystemInfo) -> str:
         """Generate file content using AI."""
@@ -78,7 +152,7 @@ class FileEditor:
             {"role": "user", "content": prompt}
         ]
 
-        return self.ai_client.generate_completion(messages, max_tokens=2000)
+        return self._stream_content(messages, "AI is generating initial content")
 
     def _modify_file_content(self, current_content: str, modification_request: str, filename: str) -> str:
         """Modify existing file content based on user request."""
@@ -89,12 +163,17 @@ class FileEditor:
             {"role": "user", "content": modification_request}
         ]
 
-        return self.ai_client.generate_completion(messages, max_tokens=2000)
+        return self._stream_content(messages, "AI is applying changes")
+
+    def _stream_content(self, messages: List[Dict[str, str]], message: str) -> str:
+        """Request file content, showing it as it is written since long files take a while."""
+        chunks = self.ai_client.generate_completion(messages, max_tokens=2000, stream=True)
+        streamed = self.display.show_streamed_text(chunks, message, "dots")
+        return self.ai_client.clean_response(streamed)
 
     def _make_changes(self, current_content: str, filename: str) -> str:
         """Handle the change-making process."""
         modification = Prompt.ask("\n[bold]What changes would you like to make?[/bold]")
-        self.console.print("[dim]Applying changes...[/dim]")
         
         old_content = current_content
         new_content = self._modify_file_content(current_content, modification, filename)
@@ -113,73 +192,89 @@ class FileEditor:
             return current_content
 
     def _save_file(self, file_path: Path, content: str, filename: str) -> bool:
-        """Save the file content."""
-        try:
-            # Create directory if it doesn't exist
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            file_path.write_text(content)
-            self.console.print(f"[green]File saved successfully: {filename}[/green]")
-            return True
-        except Exception as e:
-            self.console.print(f"[red]Error saving file: {e}[/red]")
-            if Confirm.ask("Try again?"):
-                return self._save_file(file_path, content, filename)
-            return False
+        """Save the file content, offering a bounded number of retries."""
+        for attempt in range(1, MAX_SAVE_ATTEMPTS + 1):
+            try:
+                # Create directory if it doesn't exist
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                _write_file(file_path, content)
+                self.console.print(f"[green]File saved successfully: {filename}[/green]")
+                return True
+            except Exception as e:
+                self.console.print(f"[red]Error saving file: {e}[/red]")
+                if attempt == MAX_SAVE_ATTEMPTS or not Confirm.ask("Try again?"):
+                    return False
+        return False
 
     def _exit_without_saving(self) -> bool:
-        """Handle exiting without saving."""
+        """Confirm exiting without saving; False means keep editing."""
         if Confirm.ask("Are you sure you want to exit without saving?"):
             self.console.print("[yellow]Exited without saving[/yellow]")
-            return False
-        return True  # Continue editing
+            return True
+        return False
 
     def _show_file_diff(self, old_content: str, new_content: str, filename: str):
         """Show a diff between old and new file content."""
-        old_lines = old_content.splitlines(keepends=True) if old_content else []
-        new_lines = new_content.splitlines(keepends=True)
+        import difflib
         
-        diff = list(difflib.unified_diff(
-            old_lines, 
-            new_lines, 
+        old_lines = old_content.splitlines() if old_content else []
+        new_lines = new_content.splitlines()
+        
+        # Only the region between the unchanged head and tail needs diffing
+        start, old_end, new_end = self._changed_region(old_lines, new_lines)
+        diff = difflib.unified_diff(
+            old_lines[start:old_end], 
+            new_lines[start:new_end], 
             fromfile=f"a/{filename}", 
             tofile=f"b/{filename}",
             lineterm=""
-        ))
+        )
+        diff_lines = list(itertools.islice(diff, MAX_DIFF_LINES + 1))
         
-        if diff:
-            diff_text = ''.join(diff)
+        if diff_lines:
+            if len(diff_lines) > MAX_DIFF_LINES:
+                diff_lines[MAX_DIFF_LINES:] = ["... (diff truncated)"]
+            if start:
+                diff_lines = [self._offset_hunk(line, start) for line in diff_lines]
+            diff_text = Text('\n'.join(diff_lines))
             self.console.print(Panel(diff_text, title="Changes", border_style="yellow"))
         else:
             self.console.print("[dim]No changes detected[/dim]")
+    
+    @staticmethod
+    def _changed_region(old_lines: List[str], new_lines: List[str]) -> Tuple[int, int, int]:
+        """Find where the two versions differ, keeping DIFF_CONTEXT unchanged lines either side."""
+        limit = min(len(old_lines), len(new_lines))
+        prefix = 0
+        while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old_lines[-1 - suffix] == new_lines[-1 - suffix]:
+            suffix += 1
+        
+        start = max(0, prefix - DIFF_CONTEXT)
+        trimmed_tail = max(0, suffix - DIFF_CONTEXT)
+        return start, len(old_lines) - trimmed_tail, len(new_lines) - trimmed_tail
+    
+    @staticmethod
+    def _offset_hunk(line: str, offset: int) -> str:
+        """Shift the line numbers of a hunk header from the diffed region to the whole file."""
+        match = _HUNK_RE.match(line)
+        if match is None:
+            return line
+        old_start, old_count, new_start, new_count = match.groups()
+        return (f"@@ -{int(old_start) + offset}{old_count or ''} "
+                f"+{int(new_start) + offset}{new_count or ''} @@{line[match.end():]}")
 
     def _show_file_content(self, content: str, filename: str):
         """Display file content with syntax highlighting."""
-        # Try to detect language from file extension
-        extension = Path(filename).suffix.lower()
-        language_map = {
-            '.py': 'python',
-            '.js': 'javascript',
-            '.ts': 'typescript',
-            '.html': 'html',
-            '.css': 'css',
-            '.json': 'json',
-            '.yaml': 'yaml',
-            '.yml': 'yaml',
-            '.sh': 'bash',
-            '.md': 'markdown',
-            '.sql': 'sql',
-            '.xml': 'xml',
-            '.toml': 'toml',
-            '.ini': 'ini',
-            '.conf': 'ini',
-            '.txt': 'text'
-        }
-        
-        language = language_map.get(extension, 'text')
+        # Imported here since it pulls in Pygments, which only viewing a file needs
+        from rich.syntax import Syntax
+        language = _language_for(filename)
         
         try:
             syntax = Syntax(content, language, theme="monokai", line_numbers=True)
             self.console.print(Panel(syntax, title=f"{filename}", border_style="blue"))
-        except:
+        except Exception:
             # Fallback to plain text if syntax highlighting fails
             self.console.print(Panel(content, title=f"{filename}", border_style="blue")) 
\ No newline at end of file
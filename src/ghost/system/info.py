@@ -1,28 +1,56 @@
 """System information utilities."""
 
+import functools
 import os
 import platform
-from typing import Dict
+from typing import Dict, Tuple
 from dataclasses import dataclass
 
 
-@dataclass
+@functools.lru_cache(maxsize=1)
+def _static_info() -> Tuple[str, str, str, str]:
+    """Look up the parts of the system information that can't change during a run."""
+    return (
+        platform.system(),
+        platform.release(),
+        platform.machine(),
+        os.environ.get('SHELL', '/bin/bash')
+    )
+
+
+@dataclass(frozen=True)
 class SystemInfo:
     """System information container."""
+    # Manual slots, as on CommandResult; _dict is filled in by __post_init__
+    __slots__ = ("os", "release", "machine", "shell", "cwd", "_dict")
+    
     os: str
     release: str
     machine: str
     shell: str
     cwd: str
 
+    def __post_init__(self):
+        """Build the dictionary form once, since the instance can't change."""
+        object.__setattr__(self, "_dict", {
+            "os": self.os,
+            "release": self.release,
+            "machine": self.machine,
+            "shell": self.shell,
+            "cwd": self.cwd
+        })
+    
     @classmethod
     def get_current(cls) -> "SystemInfo":
         """Get current system information."""
-        system = platform.system()
-        release = platform.release()
-        machine = platform.machine()
-        shell = os.environ.get('SHELL', '/bin/bash')
-        cwd = os.getcwd()
+        # Only the working directory is looked up again on each call
+        return cls._for_cwd(os.getcwd())
+    
+    @classmethod
+    @functools.lru_cache(maxsize=8)
+    def _for_cwd(cls, cwd: str) -> "SystemInfo":
+        """Build the system information for a working directory, once per directory."""
+        system, release, machine, shell = _static_info()
         
         return cls(
             os=system,
@@ -33,11 +61,5 @@ class SystemInfo:
         )
 
     def to_dict(self) -> Dict[str, str]:
-        """Convert to dictionary format."""
-        return {
-            "os": self.os,
-            "release": self.release,
-            "machine": self.machine,
-            "shell": self.shell,
-            "cwd": self.cwd
-        } 
\ No newline at end of file
+        """Convert to dictionary format (shared between calls, so don't modify it)."""
+        return self._dict 
\ No newline at end of file
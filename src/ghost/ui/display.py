@@ -1,7 +1,7 @@
 """UI display utilities using Rich."""
 
 import time
-from typing import List
+from typing import Dict, Iterable, Tuple
 from contextlib import contextmanager
 from rich.console import Console
 from rich.spinner import Spinner
@@ -15,9 +15,22 @@ from ..commands import CommandResult
 from ..system import SystemInfo
 
 
+# Spinner colors by a keyword of the message (checked in order, lowercased once)
+_SPINNER_COLORS = (
+    ("ai", "magenta"),
+    ("executing", "cyan"),
+    ("processing", "yellow"),
+    ("finding", "blue"),
+    ("summarizing", "green")
+)
+
+
 class DisplayManager:
     """Manages UI display using Rich console."""
     
+    # Spinner layouts by (message, style); the same few are shown over and over in a run
+    _layout_cache: Dict[Tuple[str, str], Columns] = {}
+    
     def __init__(self, console: Console):
         """Initialize the display manager."""
         self.console = console
@@ -67,10 +80,8 @@ class DisplayManager:
         """Show that a file editing command was detected."""
         self.console.print(f"\n[bold yellow]Detected file editing command:[/bold yellow] {command}")
 
-    def show_final_results(self, explanation: str, command_history: List[CommandResult]):
-        """Show the final results and explanation."""
-        # Determine overall success
-        overall_success = any(result.success for result in command_history)
+    def show_final_results(self, explanation: str, overall_success: bool):
+        """Show the final results and explanation, styled by whether any command succeeded."""
         style = "green" if overall_success else "red"
         title = "[bold green]Results[/bold green]" if overall_success else "[bold red]Failed[/bold red]"
         self.console.print(Panel(explanation, title=title, border_style=style))
@@ -118,29 +129,7 @@ class DisplayManager:
             spinner_style: The spinner style to use ('dots', 'line', 'arc', 'arrow', etc.)
             show_completion: Whether to show a completion message when done
         """
-        # Map different operations to different colors
-        color_map = {
-            "AI": "magenta",
-            "Executing": "cyan", 
-            "Processing": "yellow",
-            "Finding": "blue",
-            "Summarizing": "green"
-        }
-        
-        # Determine color based on message content
-        spinner_color = "cyan"  # default
-        for key, color in color_map.items():
-            if key.lower() in message.lower():
-                spinner_color = color
-                break
-        
-        # Create spinner with dynamic color
-        spinner = Spinner(spinner_style, style=spinner_color, speed=1.2)
-        
-        # Create the display text with styling
-        display_text = Text()
-        display_text.append(message, style=spinner_color)
-        display_text.append("...", style="dim")
+        layout = self._spinner_layout(message, spinner_style)
         
         # Use Live to update the display
         with Live(
@@ -149,8 +138,6 @@ class DisplayManager:
             refresh_per_second=10,
             transient=not show_completion
         ) as live:
-            # Create columns layout with spinner and text
-            layout = Columns([spinner, display_text], padding=(0, 1))
             live.update(layout)
             
             try:
@@ -164,6 +151,57 @@ class DisplayManager:
                     live.update(completion_text)
                     # Brief pause to show completion
                     time.sleep(0.2)
+    
+    def show_streamed_text(self, chunks: Iterable[str], message: str = "AI is thinking", spinner_style: str = "dots") -> str:
+        """
+        Render streamed text as it arrives, showing a spinner until the first chunk.
+        
+        Args:
+            chunks: Iterable of text chunks, e.g. a streamed AI completion
+            message: The message to display alongside the spinner
+            spinner_style: The spinner style to use while waiting
+        
+        Returns:
+            The full text once the stream is exhausted
+        """
+        text = Text()
+        with Live(
+            self._spinner_layout(message, spinner_style),
+            console=self.console,
+            auto_refresh=True,
+            refresh_per_second=10,
+            transient=True
+        ) as live:
+            for chunk in chunks:
+                if not text:
+                    # Swap the spinner for the text on the first chunk
+                    live.update(Panel(text, border_style="dim"))
+                text.append(chunk)
+        
+        return text.plain
+    
+    def _spinner_layout(self, message: str, spinner_style: str) -> Columns:
+        """Build the spinner-plus-message layout used while waiting, once per message and style."""
+        layout = self._layout_cache.get((message, spinner_style))
+        if layout is not None:
+            return layout
+        
+        # Determine color based on message content
+        lowered = message.lower()
+        spinner_color = next((color for key, color in _SPINNER_COLORS if key in lowered), "cyan")
+        
+        # Create spinner with dynamic color
+        spinner = Spinner(spinner_style, style=spinner_color, speed=1.2)
+        
+        # Create the display text with styling
+        display_text = Text()
+        display_text.append(message, style=spinner_color)
+        display_text.append("...", style="dim")
+        
+        # Create columns layout with spinner and text
+        layout = Columns([spinner, display_text], padding=(0, 1))
+        self._layout_cache[(message, spinner_style)] = layout
+        return layout
 
     def show_ai_thinking(self):
         """Show that AI is processing the request."""
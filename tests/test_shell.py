@@ -0,0 +1,124 @@
+"""Behaviour tests for the persistent shell and the executor built on it."""
+
+import os
+import subprocess
+import tempfile
+import time
+import unittest
+
+from ghost.commands.executor import CommandExecutor
+from ghost.commands.shell import MAX_OUTPUT_BYTES, TRUNCATION_NOTICE, PersistentShell
+
+
+@unittest.skipUnless(PersistentShell.is_supported(), "needs /bin/sh")
+class PersistentShellTest(unittest.TestCase):
+    """Run real commands through one PersistentShell."""
+    
+    def setUp(self):
+        self.shell = PersistentShell()
+        self.addCleanup(self.shell.close)
+    
+    def assertCompletesQuickly(self, command, timeout=5):
+        """Run a command and check it returned well before its timeout."""
+        started = time.monotonic()
+        result = self.shell.run(command, timeout)
+        self.assertLess(time.monotonic() - started, 2)
+        return result
+    
+    def test_output_and_exit_code(self):
+        self.assertEqual(self.shell.run("echo out; echo err >&2; (exit 4)", 5), ("out\n", "err\n", 4))
+    
+    def test_state_carries_over(self):
+        self.shell.run("GHOST_TEST=kept", 5)
+        self.assertEqual(self.shell.run("echo $GHOST_TEST", 5), ("kept\n", "", 0))
+    
+    def test_directory_carries_over(self):
+        directory = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(os.rmdir, directory)
+        
+        self.shell.run(f"cd '{directory}'", 5)
+        self.assertEqual(self.shell.cwd, directory)
+        self.assertEqual(self.shell.run("pwd", 5), (directory + "\n", "", 0))
+    
+    def test_trailing_backslash(self):
+        stdout, _, returncode = self.assertCompletesQuickly("echo done \\")
+        # Nothing follows the backslash, so it stays a literal one
+        self.assertEqual((stdout, returncode), ("done \\\n", 0))
+        self.assertEqual(self.shell.run("echo next", 5), ("next\n", "", 0))
+    
+    def test_syntax_error(self):
+        _, stderr, returncode = self.assertCompletesQuickly("if then")
+        self.assertEqual(returncode, 2)
+        self.assertIn("Syntax error", stderr)
+        self.assertEqual(self.shell.run("echo next", 5), ("next\n", "", 0))
+    
+    def test_redirected_stdout(self):
+        self.assertEqual(self.assertCompletesQuickly("exec 1>/dev/null; echo err >&2; false"), ("", "err\n", 1))
+        self.assertEqual(self.shell.run("echo next", 5), ("next\n", "", 0))
+    
+    def test_redirected_stderr(self):
+        self.assertEqual(self.assertCompletesQuickly("exec 2>/dev/null; echo out; ls /nonexistent"), ("out\n", "", 2))
+        self.assertEqual(self.shell.run("echo next >&2", 5), ("", "next\n", 0))
+    
+    def test_closed_streams(self):
+        stdout, _, returncode = self.assertCompletesQuickly("echo out; exec >&- 2>&-")
+        self.assertEqual(stdout, "out\n")
+        self.assertNotEqual(returncode, 0)
+        self.assertEqual(self.shell.run("echo next", 5), ("next\n", "", 0))
+    
+    def test_exit_restarts_shell(self):
+        self.shell.run("GHOST_TEST=lost", 5)
+        self.assertEqual(self.assertCompletesQuickly("echo bye; exit 3"), ("bye\n", "", 3))
+        self.assertEqual(self.shell.run("echo ${GHOST_TEST:-unset}", 5), ("unset\n", "", 0))
+    
+    def test_timeout_restarts_shell(self):
+        started = time.monotonic()
+        with self.assertRaises(subprocess.TimeoutExpired):
+            self.shell.run("sleep 10", 0.5)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(self.shell.run("echo next", 5), ("next\n", "", 0))
+    
+    def test_commands_read_no_input(self):
+        self.assertEqual(self.assertCompletesQuickly("read answer; echo \"[$answer]\""), ("[]\n", "", 0))
+        self.assertEqual(self.shell.run("echo next", 5), ("next\n", "", 0))
+    
+    def test_output_is_truncated(self):
+        stdout, stderr, returncode = self.shell.run(f"head -c {MAX_OUTPUT_BYTES * 3} /dev/zero | tr '\\0' y", 10)
+        self.assertEqual(stdout, "y" * MAX_OUTPUT_BYTES + TRUNCATION_NOTICE)
+        self.assertEqual((stderr, returncode), ("", 0))
+    
+    def test_output_at_the_cap_is_kept_whole(self):
+        stdout, _, _ = self.shell.run(f"head -c {MAX_OUTPUT_BYTES} /dev/zero | tr '\\0' y", 10)
+        self.assertEqual(stdout, "y" * MAX_OUTPUT_BYTES)
+
+
+@unittest.skipUnless(PersistentShell.is_supported(), "needs /bin/sh")
+class CommandExecutorTest(unittest.TestCase):
+    """Check that the executor keeps one working directory across commands."""
+    
+    def setUp(self):
+        self.directory = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(os.rmdir, self.directory)
+        # Move the shared shell and this process back once the test is done
+        self.addCleanup(CommandExecutor.execute, f"cd '{os.getcwd()}'")
+    
+    def test_cd_moves_the_process(self):
+        CommandExecutor.execute(f"cd '{self.directory}'")
+        self.assertEqual(os.getcwd(), self.directory)
+    
+    def test_directory_survives_restart(self):
+        CommandExecutor.execute(f"cd '{self.directory}'")
+        self.assertEqual(CommandExecutor.execute("exit 3").returncode, 3)
+        self.assertEqual(CommandExecutor.execute("pwd").stdout, self.directory + "\n")
+    
+    def test_sudo_commands_use_the_same_directory(self):
+        CommandExecutor.execute(f"cd '{self.directory}'")
+        self.assertEqual(CommandExecutor.execute("echo sudo; pwd").stdout, f"sudo\n{self.directory}\n")
+    
+    def test_one_off_output_is_truncated(self):
+        stdout, _, _ = CommandExecutor._run_once(f"head -c {MAX_OUTPUT_BYTES * 3} /dev/zero | tr '\\0' y", 10)
+        self.assertEqual(stdout, "y" * MAX_OUTPUT_BYTES + TRUNCATION_NOTICE)
+
+
+if __name__ == "__main__":
+    unittest.main()